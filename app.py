@@ -1,13 +1,88 @@
 import streamlit as st
-from PIL import Image, ImageOps, ImageFilter
-import pytesseract
-import tempfile
+from PIL import Image
+import numpy as np
+import cv2
 import os
 import io
+import tempfile
 
 # Import custom modules
 from ner.ner import extract_entities
 from rag.query import run_query, search_medicine, search_symptom
+from ocr.ocr import get_tess_api
+from models import get_whisper, get_tts_engine
+
+# Text-to-speech: synthesize into RAM-backed tmpfs when available, and cap
+# the spoken text so synthesis time stays bounded
+TTS_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+TTS_MAX_CHARS = 1500
+
+
+def autocontrast_lut(arr: np.ndarray, cutoff: int = 2) -> np.ndarray:
+    """
+    Build the lookup table ImageOps.autocontrast(cutoff=...) would apply.
+    
+    Args:
+        arr: 8-bit grayscale image array
+        cutoff: Percent of pixels to clip from each end of the histogram
+        
+    Returns:
+        256-entry uint8 lookup table
+    """
+    cdf = np.cumsum(np.bincount(arr.ravel(), minlength=256))
+    cut = arr.size * cutoff // 100
+    lo = int(np.searchsorted(cdf, cut, side="right"))
+    hi = int(np.searchsorted(cdf, arr.size - cut, side="left"))
+    if hi <= lo:
+        return np.arange(256, dtype=np.uint8)
+    scale = 255.0 / (hi - lo)
+    lut = (np.arange(256) * scale - lo * scale).astype(np.int32)
+    return np.clip(lut, 0, 255).astype(np.uint8)
+
+
+# Cached computations (keyed on their inputs, survive widget reruns)
+@st.cache_data(show_spinner=False)
+def ocr_prescription(file_bytes: bytes) -> tuple[Image.Image, str]:
+    """
+    Preprocess a prescription image and extract its text.
+    
+    Args:
+        file_bytes: Raw bytes of the uploaded image
+        
+    Returns:
+        Tuple of (processed image, OCR text)
+    """
+    image = Image.open(io.BytesIO(file_bytes))
+    # Let libjpeg decode straight to grayscale at reduced scale
+    # (no-op for non-JPEG uploads)
+    image.draft("L", (1800, 1800))
+    # Convert to grayscale; the remaining steps run as vectorized OpenCV passes
+    arr = np.asarray(image.convert("L"))
+    # Auto contrast (2% cutoff), applied as a single LUT pass
+    arr = cv2.LUT(arr, autocontrast_lut(arr, cutoff=2))
+    # Resize if too small
+    h, w = arr.shape
+    if min(w, h) < 900:
+        scale = 900 / min(w, h)
+        arr = cv2.resize(arr, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_LANCZOS4)
+    # Threshold (Otsu picks the cutoff from the histogram, so dim or
+    # backlit scans don't come out blank as with a fixed cutoff)
+    _, arr = cv2.threshold(arr, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    gray = Image.fromarray(arr)
+    
+    # OCR in-process: no PNG encode, temp file or tesseract subprocess
+    api, lock = get_tess_api()
+    with lock:
+        api.SetImage(gray)
+        text = api.GetUTF8Text()
+    return gray, text
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def cached_extract(text: str) -> dict:
+    """Run entity extraction, reusing results for identical text."""
+    return extract_entities(text)
+
 
 # Page configuration
 st.set_page_config(
@@ -123,38 +198,21 @@ if option == "Upload Prescription":
     
     if uploaded_file:
         try:
-            image = Image.open(uploaded_file)
-            uploaded_image = image
+            file_bytes = uploaded_file.getvalue()
+            uploaded_image = file_bytes
             
             col1, col2 = st.columns(2)
             
             with col1:
-                st.image(image, caption="Original Image", use_column_width=True)
+                st.image(file_bytes, caption="Original Image", use_column_width=True)
             
-            # Preprocess image
-            with st.spinner("🔄 Processing image..."):
-                # Convert to grayscale
-                gray = ImageOps.grayscale(image)
-                # Auto contrast
-                gray = ImageOps.autocontrast(gray, cutoff=2)
-                # Resize if too small
-                w, h = gray.size
-                if min(w, h) < 900:
-                    scale = 900 / min(w, h)
-                    gray = gray.resize((int(w * scale), int(h * scale)), Image.Resampling.LANCZOS)
-                # Threshold
-                gray = gray.point(lambda p: 255 if p > 160 else 0)
-                # Sharpen
-                gray = gray.filter(ImageFilter.UnsharpMask(radius=1, percent=120, threshold=5))
+            # Preprocess image and perform OCR (cached per uploaded file)
+            with st.spinner("🔍 Extracting text from image..."):
+                gray, text = ocr_prescription(file_bytes)
             
             with col2:
                 st.image(gray, caption="Processed Image", use_column_width=True)
             
-            # Perform OCR
-            with st.spinner("🔍 Extracting text from image..."):
-                config = "--oem 3 --psm 6"
-                text = pytesseract.image_to_string(gray, lang="eng", config=config)
-            
             if show_raw_ocr and text:
                 st.subheader("📄 Raw OCR Output")
                 with st.expander("Click to view raw text"):
@@ -196,28 +254,23 @@ elif option == "Voice Input":
     if st.button("🎙️ Start Recording (10 seconds)"):
         try:
             import sounddevice as sd
-            import soundfile as sf
-            import whisper
             
             with st.spinner("🎤 Recording... Speak now!"):
                 # Record audio
                 duration = 10  # seconds
                 fs = 16000  # Sample rate
-                audio = sd.rec(int(duration * fs), samplerate=fs, channels=1)
+                audio = sd.rec(int(duration * fs), samplerate=fs, channels=1, dtype="float32")
                 sd.wait()
+                # (frames, 1) -> (frames,), Whisper takes the mono buffer directly
+                audio = audio.squeeze()
                 
-                # Save to temporary file
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_audio:
-                    sf.write(tmp_audio.name, audio, fs)
-                    
-                    # Transcribe with Whisper
-                    with st.spinner("🔄 Converting speech to text..."):
-                        model = whisper.load_model("base")
-                        result = model.transcribe(tmp_audio.name)
-                        text = result.get("text", "")
-                    
-                    # Clean up
-                    os.unlink(tmp_audio.name)
+                # Transcribe with Whisper
+                with st.spinner("🔄 Converting speech to text..."):
+                    model = get_whisper()
+                    segments, _ = model.transcribe(
+                        audio, batch_size=8, beam_size=1, vad_filter=True
+                    )
+                    text = "".join(seg.text for seg in segments).strip()
             
             if text:
                 st.success(f"✅ You said: {text}")
@@ -225,7 +278,7 @@ elif option == "Voice Input":
                 st.warning("⚠️ Could not understand audio. Please try again.")
                 
         except ImportError:
-            st.error("❌ Voice input requires: pip install sounddevice soundfile openai-whisper")
+            st.error("❌ Voice input requires: pip install sounddevice faster-whisper")
         except Exception as e:
             st.error(f"❌ Recording error: {str(e)}")
 
@@ -238,7 +291,7 @@ if st.button("🔬 Analyze with MediLex", type="primary", use_container_width=Tr
     else:
         # Extract entities
         with st.spinner("🧠 Analyzing..."):
-            entities = extract_entities(text)
+            entities = cached_extract(text)
         
         # Display results in tabs
         tab1, tab2, tab3, tab4 = st.tabs(["💊 Medicines", "🩺 Symptoms", "🥗 Diet", "💡 Explanation"])
@@ -346,26 +399,29 @@ if st.button("🔬 Analyze with MediLex", type="primary", use_container_width=Tr
                 
                 if st.button("🎧 Generate Audio"):
                     try:
-                        import pyttsx3
-                        
                         with st.spinner("🔊 Generating audio..."):
-                            engine = pyttsx3.init()
-                            
-                            # Configure voice
-                            engine.setProperty('rate', 150)  # Speed
-                            engine.setProperty('volume', 0.9)  # Volume
+                            engine, lock = get_tts_engine()
                             
-                            # Save to file
-                            audio_file = "output.mp3"
-                            engine.save_to_file(answer, audio_file)
-                            engine.runAndWait()
+                            # Synthesize to a scratch file (pyttsx3 only writes to paths)
+                            fd, audio_file = tempfile.mkstemp(suffix=".wav", dir=TTS_TMP_DIR)
+                            os.close(fd)
+                            try:
+                                # One session at a time: the engine's queue and
+                                # run loop are shared
+                                with lock:
+                                    # Configure voice
+                                    engine.setProperty('rate', 150)  # Speed
+                                    engine.setProperty('volume', 0.9)  # Volume
+                                    engine.save_to_file(answer[:TTS_MAX_CHARS], audio_file)
+                                    engine.runAndWait()
+                                with open(audio_file, "rb") as f:
+                                    audio_bytes = f.read()
+                            finally:
+                                os.remove(audio_file)
                         
-                        # Play audio
-                        if os.path.exists(audio_file):
-                            with open(audio_file, "rb") as f:
-                                audio_bytes = f.read()
-                            st.audio(audio_bytes, format="audio/mp3")
-                            os.remove(audio_file)
+                        # Play audio straight from memory
+                        if audio_bytes:
+                            st.audio(audio_bytes, format="audio/wav")
                         else:
                             st.error("❌ Audio generation failed.")
                             
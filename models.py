@@ -0,0 +1,35 @@
+"""
+Heavy model / engine handles shared by the Streamlit app.
+
+Each loader is wrapped in st.cache_resource, so the handle is built once per
+process and reused across script reruns and sessions.
+"""
+import threading
+import streamlit as st
+
+
+@st.cache_resource(show_spinner=False)
+def get_whisper(name="base"):
+    """Load the faster-whisper (CTranslate2) speech-to-text pipeline."""
+    import ctranslate2
+    from faster_whisper import WhisperModel, BatchedInferencePipeline
+
+    # INT8 weights on CPU, FP16 on GPU
+    if ctranslate2.get_cuda_device_count() > 0:
+        model = WhisperModel(name, device="cuda", compute_type="float16")
+    else:
+        model = WhisperModel(name, device="cpu", compute_type="int8")
+    # Splits audio into VAD chunks and decodes them in batches
+    return BatchedInferencePipeline(model=model)
+
+
+@st.cache_resource(show_spinner=False)
+def get_tts_engine():
+    """
+    Initialize the pyttsx3 text-to-speech engine.
+    
+    The engine has a single run loop and property set shared by every
+    session, so it is returned together with the lock that guards it.
+    """
+    import pyttsx3
+    return pyttsx3.init(), threading.Lock()
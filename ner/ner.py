@@ -1,19 +1,36 @@
 # ner.py
 import re
-from difflib import get_close_matches
+from functools import lru_cache
+from rapidfuzz import process, fuzz
 
 # ---------- (optional) NLP - not used below but kept for compatibility ----------
-try:
-    import spacy
+@lru_cache(maxsize=1)
+def get_nlp():
+    """
+    Load the spaCy pipeline once, on first use.
+    
+    Only the components behind `doc.ents` and `doc.noun_chunks` (ner, parser)
+    are kept; tagger/attribute_ruler/lemmatizer are disabled.
+    
+    Returns:
+        spaCy Language object, or None if spaCy / no model is installed
+    """
     try:
-        nlp = spacy.load("en_core_sci_sm")
+        import spacy
     except Exception:
+        return None
+    for model in ("en_core_sci_sm", "en_core_web_sm"):
         try:
-            nlp = spacy.load("en_core_web_sm")
+            return spacy.load(model, disable=["tagger", "attribute_ruler", "lemmatizer"])
         except Exception:
-            nlp = None
-except Exception:
-    nlp = None
+            continue
+    return None
+
+def __getattr__(name):
+    # `ner.nlp` used to be loaded eagerly at import; resolve it lazily instead
+    if name == "nlp":
+        return get_nlp()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ---------- Canonical list ----------
 CANON_MEDS = [
@@ -25,7 +42,8 @@ CANON_MEDS = [
     "Losartan", "Gabapentin", "Hydrochlorothiazide", "Prednisone",
     "Montelukast", "Sertraline", "Furosemide", "Pantoprazole"
 ]
-CANON_MEDS_LOWER = [m.lower() for m in CANON_MEDS]
+# lower-cased name -> canonical spelling (O(1) exact lookups)
+CANON_LOOKUP = {m.lower(): m for m in CANON_MEDS}
 
 # OCR aliases / misspellings
 ALIASES = {
@@ -51,6 +69,22 @@ FREQ_RE = re.compile(r"\b(OD|QD|BD|BID|TID|QID|HS|QHS|PRN|SOS|Q\d+h)\b", re.I)
 DOSE_RE = re.compile(rf"\b(\d{{1,4}}(?:\.\d{{1,2}})?)\s*({DOSE_UNITS})\b", re.I)
 FORM_RE = re.compile(r"\b(tab|tablet|cap|capsule|syr(?:up)?|susp(?:ension)?|inj(?:ection)?|drops?)\b", re.I)
 
+# OCR-slip fixes and name extraction (compiled once, used per line)
+# single-char slips: bullets/dashes -> "-", pipe -> "1"
+CHAR_FIX = str.maketrans({"\u2022": "-", "\u2014": "-", "\u2013": "-", "|": "1"})
+# unit slips " ag"/" m9"/" my"/" rng" -> " mg" (dropping a trailing "."), bare "m9" -> "mg"
+UNIT_SLIP_RE = re.compile(r" (?:ag|m9|my|rng|mg)\.?|m9")
+ONE_TAB_RE = re.compile(r"\b1\s*ab\b", re.I)
+# letters read for digits when sandwiched between digits
+DIGIT_SLIP_RE = re.compile(r"(?<=\d)[OoIlZz](?=\d)")
+DIGIT_FIX = {"O": "0", "o": "0", "I": "1", "l": "1", "Z": "2", "z": "2"}
+MULTI_SPACE_RE = re.compile(r"\s{2,}")
+NAME_RE = re.compile(r"([A-Za-z][A-Za-z\-]{2,})")
+TRAIL_TOKEN_RE = re.compile(r"\b(tab|tablet|cap|capsule|mg|mcg|g|ml|iu|units|%)\b", re.I)
+TOKEN_SPLIT_RE = re.compile(r"[^\w]+")
+# Non-empty lines, split on the same boundaries as str.splitlines()
+LINE_RE = re.compile(r"[^\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]+")
+
 # ---------- Admin / Non-med filters ----------
 ADMIN_KEYWORDS = [
     "dea", "lic", "medical centre", "medical center", "hospital",
@@ -58,66 +92,71 @@ ADMIN_KEYWORDS = [
     "refill", "label", "stock", "presc", "usa", "new york", "street", "avenue",
     "road", "ny", "zip", "wtx", "adobe"
 ]
-
-def _looks_like_admin_text(line: str) -> bool:
-    low = line.lower().strip()
-    if not low:
+# One alternation so a line is scanned once for every keyword (plain substring
+# semantics, same as `k in line.lower()`); case-insensitive so callers need not
+# build a lowered copy of each line
+ADMIN_RE = re.compile("|".join(map(re.escape, ADMIN_KEYWORDS)), re.I)
+RX_MARKER_RE = re.compile(r"[rx\W\d]{1,4}", re.I)
+
+def _looks_like_admin_header(line: str) -> bool:
+    # cheap checks only (no dose/freq/form searches)
+    s = line.strip()
+    if not s:
         return True
-    if any(k in low for k in ADMIN_KEYWORDS):
-        return True
-    # addressy lines: commas but no dose/freq/form
-    if "," in low and not (DOSE_RE.search(low) or FREQ_RE.search(low) or FORM_RE.search(low)):
+    if ADMIN_RE.search(s):
         return True
     # tiny tokens / RX marker
-    if re.fullmatch(r"[rx\W\d]{1,4}", low):
+    if RX_MARKER_RE.fullmatch(s):
         return True
     return False
 
+def _looks_like_admin_text(line: str) -> bool:
+    if _looks_like_admin_header(line):
+        return True
+    # addressy lines: commas but no dose/freq/form
+    return "," in line and not (DOSE_RE.search(line) or FREQ_RE.search(line) or FORM_RE.search(line))
+
 # ---------- Normalization ----------
 def _normalize_line(line: str) -> str:
-    s = line
-    s = (s.replace("\u2022", "-")  # •
-           .replace("\u2014", "-") # —
-           .replace("\u2013", "-"))# –
-    s = s.replace("|", "1")
+    s = line.translate(CHAR_FIX)
     # Fix OCR slips
-    s = s.replace(" ag", " mg").replace(" m9", " mg").replace("m9", "mg")
-    s = s.replace(" my", " mg").replace(" rng", " mg").replace(" mg.", " mg")
-    s = re.sub(r"\b1\s*ab\b", "1 tab", s, flags=re.I)
+    s = UNIT_SLIP_RE.sub(lambda m: " mg" if m.group()[0] == " " else "mg", s)
+    s = ONE_TAB_RE.sub("1 tab", s)
     # digit/letter confusions
-    s = re.sub(r"(?<=\d)[Oo](?=\d)", "0", s)
-    s = re.sub(r"(?<=\d)[Il](?=\d)", "1", s)
-    s = re.sub(r"(?<=\d)[Zz](?=\d)", "2", s)
-    return re.sub(r"\s{2,}", " ", s).strip()
+    s = DIGIT_SLIP_RE.sub(lambda m: DIGIT_FIX[m.group()], s)
+    return MULTI_SPACE_RE.sub(" ", s).strip()
 
 # ---------- Fuzzy canonicalization ----------
 def _fuzzy_canon(name: str) -> str:
     q = name.lower().strip(" .:-")
     if q in ALIASES:
         return ALIASES[q]
-    if q in CANON_MEDS_LOWER:
-        return CANON_MEDS[CANON_MEDS_LOWER.index(q)]
+    if q in CANON_LOOKUP:
+        return CANON_LOOKUP[q]
     # prefer full-string high similarity
-    match = get_close_matches(q, CANON_MEDS_LOWER, n=1, cutoff=0.6)
+    # (extractOne returns (choice, score, index); the choice is a CANON_LOOKUP key)
+    match = process.extractOne(q, CANON_LOOKUP.keys(), scorer=fuzz.ratio, score_cutoff=60)
     if match:
-        return CANON_MEDS[CANON_MEDS_LOWER.index(match[0])]
+        return CANON_LOOKUP[match[0]]
     # token-by-token fallback
-    tokens = [t for t in re.split(r"[^\w]+", q) if len(t) > 2]
+    tokens = [t for t in TOKEN_SPLIT_RE.split(q) if len(t) > 2]
     for t in tokens:
         if t in ALIASES:
             return ALIASES[t]
-        m = get_close_matches(t, CANON_MEDS_LOWER, n=1, cutoff=0.6)
+        m = process.extractOne(t, CANON_LOOKUP.keys(), scorer=fuzz.ratio, score_cutoff=60)
         if m:
-            return CANON_MEDS[CANON_MEDS_LOWER.index(m[0])]
+            return CANON_LOOKUP[m[0]]
     return name.title()
 
 # ---------- Parser ----------
 def _parse_line_to_med(line: str):
     s = _normalize_line(line)
-    if _looks_like_admin_text(s):
+    # keyword / RX-marker lines (most of a prescription header) stop here
+    if _looks_like_admin_header(s):
         return None
 
-    # must look like a med instruction
+    # must look like a med instruction; this also drops comma-separated
+    # address lines, so the features are only searched once per line
     freq_match = FREQ_RE.search(s)
     dose_match = DOSE_RE.search(s)
     has_form = FORM_RE.search(s)
@@ -130,19 +169,20 @@ def _parse_line_to_med(line: str):
 
     # drug name: use first word (robust) or left part before dash
     left = s.split("-")[0].strip()
-    m = re.match(r"([A-Za-z][A-Za-z\-]{2,})", left)
+    m = NAME_RE.match(left)
     name_part = m.group(1) if m else left
     # remove trailing form/unit tokens
-    name_part = re.sub(r"\b(tab|tablet|cap|capsule|mg|mcg|g|ml|iu|units|%)\b", "", name_part, flags=re.I).strip()
+    name_part = TRAIL_TOKEN_RE.sub("", name_part).strip()
 
     if not name_part:
         return None
 
     canon = _fuzzy_canon(name_part)
-    route = "Oral (Tablet)" if "tab" in s.lower() else ("Injection" if "inj" in s.lower() else "Oral")
+    low = s.lower()
+    route = "Oral (Tablet)" if "tab" in low else ("Injection" if "inj" in low else "Oral")
 
     # final validation: avoid admin-like names
-    if _looks_like_admin_text(canon.lower()):
+    if _looks_like_admin_text(canon):
         return None
 
     return {
@@ -158,7 +198,9 @@ def _parse_line_to_med(line: str):
 def _extract_meds(text: str):
     meds = []
     seen = set()
-    for l in text.splitlines():
+    # iterate lazily instead of materializing the full splitlines() list
+    for line_match in LINE_RE.finditer(text):
+        l = line_match.group()
         if not l.strip():
             continue
         m = _parse_line_to_med(l)
@@ -0,0 +1,169 @@
+# ocr.py
+import os
+import io
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+import numpy as np
+from tesserocr import PyTessBaseAPI, OEM
+
+OCR_CACHE_DIR = "cache"
+
+# Row-gap tiling for long pages: only pages at least TILE_MIN_PAGE_HEIGHT rows
+# tall are split (shorter ones OCR faster in one call). A run of at least
+# TILE_GAP_ROWS near-blank rows (at most TILE_NOISE_PIXELS dark pixels) splits
+# the page, tiles are kept at least TILE_MIN_HEIGHT rows tall, and up to
+# TILE_MAX_WORKERS tiles are OCR'd at once
+TILE_MIN_PAGE_HEIGHT = 3000
+TILE_GAP_ROWS = 20
+TILE_NOISE_PIXELS = 2
+TILE_MIN_HEIGHT = 600
+TILE_MAX_WORKERS = 4
+
+# Per-thread Tesseract handles for the tile pool's worker threads
+_TILE_LOCAL = threading.local()
+
+# In-process OCR results keyed by image/config hash (PIL images are not
+# hashable, so functools.lru_cache can't key on them directly)
+_OCR_MEMO = {}
+
+@lru_cache(maxsize=None)
+def get_tess_api(psm=6):
+    """
+    Create an in-process Tesseract handle (eng, --oem 3) for a page
+    segmentation mode.
+    
+    Handles are reused across calls, so libtesseract and the language model
+    are loaded once instead of spawning the tesseract CLI per image. A handle
+    is not thread-safe (the Streamlit app serves sessions from several
+    threads), so it is returned together with the lock that guards it.
+    
+    Args:
+        psm: Tesseract page segmentation mode
+        
+    Returns:
+        Tuple of (tesserocr.PyTessBaseAPI, threading.Lock)
+    """
+    return _new_tess_api(psm), threading.Lock()
+
+def _new_tess_api(psm):
+    api = PyTessBaseAPI(lang="eng", psm=psm, oem=OEM.DEFAULT)
+    # Input is already binarized dark-on-light text; skip the inverted retry
+    api.SetVariable("tessedit_do_invert", "0")
+    return api
+
+def _run_tesseract(img, psm):
+    api, lock = get_tess_api(psm)
+    with lock:
+        api.SetImage(img)
+        return api.GetUTF8Text()
+
+def split_tiles(img):
+    """
+    Split a binarized page into horizontal bands along blank row gaps.
+    
+    Args:
+        img: Binarized (or near-binary grayscale) PIL Image object
+        
+    Returns:
+        List of (top, bottom) row ranges covering the whole image
+    """
+    arr = np.asarray(img)
+    h = arr.shape[0]
+    blank = (arr < 128).sum(axis=1) <= TILE_NOISE_PIXELS
+    # starts/ends of each run of blank rows
+    edges = np.diff(np.concatenate(([0], blank.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    
+    bounds = [0]
+    for s, e in zip(starts, ends):
+        # cut in the middle of long interior gaps, never leaving slivers
+        cut = (s + e) // 2
+        if e - s >= TILE_GAP_ROWS and 0 < s and e < h and cut - bounds[-1] >= TILE_MIN_HEIGHT:
+            bounds.append(int(cut))
+    if len(bounds) > 1 and h - bounds[-1] < TILE_MIN_HEIGHT:
+        bounds.pop()
+    bounds.append(h)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+@lru_cache(maxsize=1)
+def _get_tile_pool():
+    """Thread pool for tile OCR, created on first use and reused."""
+    workers = min(TILE_MAX_WORKERS, os.cpu_count() or 1)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-tile")
+
+def _run_tesseract_tile(img, psm):
+    # Runs on a tile pool thread: each thread keeps its own handle per psm,
+    # so tiles are recognized concurrently (tesserocr releases the GIL)
+    apis = getattr(_TILE_LOCAL, "apis", None)
+    if apis is None:
+        apis = _TILE_LOCAL.apis = {}
+    if psm not in apis:
+        apis[psm] = _new_tess_api(psm)
+    api = apis[psm]
+    api.SetImage(img)
+    return api.GetUTF8Text()
+
+def _ocr_tiles(img, psm):
+    """OCR a long page tile-by-tile on the tile pool, or directly otherwise."""
+    if img.height < TILE_MIN_PAGE_HEIGHT:
+        return _run_tesseract(img, psm)
+    tiles = split_tiles(img)
+    if len(tiles) == 1:
+        return _run_tesseract(img, psm)
+    
+    crops = [img.crop((0, top, img.width, bottom)) for top, bottom in tiles]
+    texts = _get_tile_pool().map(_run_tesseract_tile, crops, repeat(psm))
+    return "\n".join(texts)
+
+def ocr_image(img, psm=6, use_cache=True):
+    """
+    Run Tesseract on an image, caching the text by image content.
+    
+    Results are memoized in-process and persisted to OCR_CACHE_DIR as
+    <blake2b of pixels + mode/size + config>.txt, so re-running on the same
+    image skips Tesseract entirely. Long pages with blank row gaps are split
+    into tiles that are OCR'd in parallel threads.
+    
+    Args:
+        img: PIL Image object
+        psm: Tesseract page segmentation mode
+        use_cache: Read/write the OCR cache
+        
+    Returns:
+        Extracted text as string
+    """
+    config = f"--oem 3 --psm {psm}"
+    if not use_cache:
+        return _ocr_tiles(img, psm)
+    
+    h = hashlib.blake2b(img.tobytes(), digest_size=16)
+    h.update(f"{img.mode}|{img.size}|eng|{config}".encode())
+    key = h.hexdigest()
+    if key in _OCR_MEMO:
+        return _OCR_MEMO[key]
+    
+    cache_file = os.path.join(OCR_CACHE_DIR, f"{key}.txt")
+    if os.path.exists(cache_file):
+        with io.open(cache_file, "r", encoding="utf-8", newline="") as f:
+            text = f.read()
+    else:
+        text = _ocr_tiles(img, psm)
+        os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+        # Write to a temp file and rename it into place, so an interrupted
+        # run or a concurrent reader never sees a partial cache entry
+        fd, tmp_file = tempfile.mkstemp(suffix=".tmp", dir=OCR_CACHE_DIR)
+        try:
+            with io.open(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+            os.replace(tmp_file, cache_file)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
+    
+    _OCR_MEMO[key] = text
+    return text
@@ -1,10 +1,12 @@
 import sys
 import os
-from PIL import Image, ImageOps, ImageFilter
-import pytesseract
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageOps
 
 from ner.ner import extract_entities
 from rag.query import run_query
+from ocr.ocr import ocr_image
 
 # Default image path
 IMG = "sample_prescription.jpg"
@@ -16,30 +18,67 @@ def preprocess_image(img_path):
         
         # Grayscale
         g = ImageOps.grayscale(img)
+        # Already a clean high-resolution binary scan: nothing to improve
+        w, h = g.size
+        if min(w, h) >= 1200:
+            hist = np.bincount(np.asarray(g).ravel(), minlength=256)
+            if (hist[:16].sum() + hist[240:].sum()) / hist.sum() > 0.95:
+                return g
         # Auto contrast
         g = ImageOps.autocontrast(g, cutoff=2)
-        # Resize if small
+        # Resize if small (bilinear is enough: the result is thresholded next)
         w, h = g.size
         if min(w, h) < 900:
             scale = 900 / min(w, h)
-            g = g.resize((int(w * scale), int(h * scale)), Image.Resampling.LANCZOS)
+            g = g.resize((int(w * scale), int(h * scale)), Image.Resampling.BILINEAR)
         # Threshold
-        g = g.point(lambda p: 255 if p > 160 else 0)
-        # Sharpen
-        g = g.filter(ImageFilter.UnsharpMask(radius=1, percent=120, threshold=5))
+        arr = np.asarray(g, dtype=np.uint8)
+        g = Image.fromarray(np.where(arr > 160, np.uint8(255), np.uint8(0)))
         
         return g
     except Exception as e:
         print(f"❌ Image preprocessing error: {e}")
         return None
 
-def run_pipeline(img_path=IMG, translate=True):
+@lru_cache(maxsize=64)
+def extract_entities_cached(text):
+    """
+    Run entity extraction, reusing results for identical OCR text.
+    
+    Bounded LRU cache within this process, so repeated run_pipeline calls
+    on the same prescription skip NER.
+    """
+    return extract_entities(text) or {}
+
+@lru_cache(maxsize=1)
+def get_hindi_translator():
+    """
+    Load the offline English → Hindi Argos Translate model once.
+    
+    Returns:
+        argostranslate translation object
+    """
+    from argostranslate import translate
+    try:
+        translator = translate.get_translation_from_codes("en", "hi")
+    except AttributeError:
+        # raised when either language package is missing
+        translator = None
+    if translator is None:
+        raise RuntimeError(
+            "English → Hindi model not installed. "
+            "Install with: argospm update && argospm install translate-en_hi"
+        )
+    return translator
+
+def run_pipeline(img_path=IMG, translate=True, use_cache=True):
     """
     Run complete MediLex pipeline: OCR → NER → RAG → Translation
     
     Args:
         img_path: Path to prescription image
         translate: Whether to translate to Hindi
+        use_cache: Reuse cached OCR text for identical images
     """
     print("\n" + "="*70)
     print("🩺 MEDILEX PIPELINE - COMPLETE ANALYSIS")
@@ -66,7 +105,7 @@ def run_pipeline(img_path=IMG, translate=True):
     print("-" * 70)
     
     try:
-        text = pytesseract.image_to_string(img, lang="eng", config="--oem 3 --psm 6")
+        text = ocr_image(img, psm=6, use_cache=use_cache)
         print(f"✅ OCR completed. Extracted {len(text)} characters.")
         print("\n📄 OCR Output (first 400 chars):")
         print("-" * 70)
@@ -80,7 +119,7 @@ def run_pipeline(img_path=IMG, translate=True):
     print("\n🧠 STEP 3: Named Entity Recognition (NER)")
     print("-" * 70)
     
-    ents = extract_entities(text)
+    ents = extract_entities_cached(text)
     
     # Medicines
     meds = ents.get("medications", [])
@@ -92,18 +131,16 @@ def run_pipeline(img_path=IMG, translate=True):
         w2 = max(10, max(len(m.get("dose", "")) for m in meds))
         w3 = max(15, max(len(m.get("freq_expanded", "")) for m in meds))
         
-        # Print table
+        # Build the table and print it in one call
         header = f'{"Medicine".ljust(w1)}  {"Dose".ljust(w2)}  {"Frequency".ljust(w3)}'
-        print(header)
-        print("-" * len(header))
-        
-        for m in meds:
-            freq = m.get("freq_expanded") or m.get("freq", "")
-            print(
-                f'{m.get("name", "").ljust(w1)}  '
-                f'{m.get("dose", "").ljust(w2)}  '
-                f'{freq.ljust(w3)}'
-            )
+        lines = [header, "-" * len(header)]
+        lines.extend(
+            f'{m.get("name", "").ljust(w1)}  '
+            f'{m.get("dose", "").ljust(w2)}  '
+            f'{(m.get("freq_expanded") or m.get("freq", "")).ljust(w3)}'
+            for m in meds
+        )
+        print("\n".join(lines))
         print()
     else:
         print("ℹ️  No medicines detected.\n")
@@ -118,8 +155,7 @@ def run_pipeline(img_path=IMG, translate=True):
     if diet:
         print("🥗 DIET & LIFESTYLE RECOMMENDATIONS:")
         print("-" * 70)
-        for i, d in enumerate(diet, 1):
-            print(f"{i}. {d}")
+        print("\n".join(f"{i}. {d}" for i, d in enumerate(diet, 1)))
         print()
     
     # Step 4: RAG Explanation
@@ -153,20 +189,19 @@ def run_pipeline(img_path=IMG, translate=True):
         print("-" * 70)
         
         try:
-            from googletrans import Translator
-            translator = Translator()
+            translator = get_hindi_translator()
             
-            # Translate the answer
-            translation = translator.translate(answer, src="en", dest="hi")
+            # Translate the answer (offline, no network round-trip)
+            translation = translator.translate(answer)
             
             print("📝 अनुवाद (Hindi):")
             print("-" * 70)
-            print(translation.text)
+            print(translation)
             print()
             
         except ImportError:
-            print("⚠️  Translation skipped: googletrans not installed")
-            print("   Install with: pip install googletrans==4.0.0rc1\n")
+            print("⚠️  Translation skipped: argostranslate not installed")
+            print("   Install with: pip install argostranslate\n")
         except Exception as e:
             print(f"⚠️  Translation error: {e}\n")
     
@@ -199,10 +234,15 @@ def main():
         action="store_true",
         help="Skip Hindi translation"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always run Tesseract, ignoring cached OCR results"
+    )
     
     args = parser.parse_args()
     
-    run_pipeline(args.img, translate=not args.no_translate)
+    run_pipeline(args.img, translate=not args.no_translate, use_cache=not args.no_cache)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
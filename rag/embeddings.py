@@ -0,0 +1,22 @@
+from functools import lru_cache
+from langchain_community.embeddings import HuggingFaceEmbeddings
+import torch
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+@lru_cache(maxsize=1)
+def get_embeddings():
+    """
+    Load the MiniLM embedding model once per process.
+    
+    Shared by ingest.py and query.py so the weights are only held in memory
+    once when both are imported.
+    
+    Returns:
+        HuggingFaceEmbeddings object (the SentenceTransformer is `.client`)
+    """
+    return HuggingFaceEmbeddings(
+        model_name=MODEL_NAME,
+        model_kwargs={'device': 'cuda' if torch.cuda.is_available() else 'cpu'},
+        encode_kwargs={'normalize_embeddings': True, 'batch_size': 128}
+    )
@@ -1,12 +1,112 @@
 import os
+import re
+import json
+import shutil
+import hashlib
 from pathlib import Path
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+try:
+    from rag.embeddings import get_embeddings
+except ImportError:
+    # run as a script from inside rag/
+    from embeddings import get_embeddings
 
 CORPUS_DIR = "corpus"
 PERSIST_DIR = "chroma_db"
+MANIFEST_FILE = "manifest.json"
+# Bumped whenever the store layout changes so older stores are rebuilt
+# (2: HNSW collection metadata)
+MANIFEST_VERSION = 2
+
+# HNSW index settings; only applied when the collection is first created.
+# MiniLM embeddings are normalized, so cosine is the natural space.
+HNSW_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 200,
+    "hnsw:M": 32,
+}
+
+# Chunking: sentences are packed into chunks of at most CHUNK_SIZE characters,
+# each starting with up to CHUNK_OVERLAP characters from the previous chunk
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+# Paragraph breaks, or whitespace after sentence-ending punctuation
+SENT_RE = re.compile(r"\n\s*\n\s*|(?<=[.!?])\s+")
+
+def _split_text(text):
+    """
+    Split text into overlapping chunks on sentence/paragraph boundaries.
+    
+    Args:
+        text: Document text
+        
+    Returns:
+        List of chunk strings
+    """
+    chunks = []
+    cur = ""
+    for sent in SENT_RE.split(text):
+        sent = sent.strip()
+        if not sent:
+            continue
+        # hard-wrap sentences that don't fit in a chunk on their own
+        while len(sent) > CHUNK_SIZE:
+            if cur:
+                chunks.append(cur)
+                cur = ""
+            chunks.append(sent[:CHUNK_SIZE])
+            sent = sent[CHUNK_SIZE - CHUNK_OVERLAP:]
+        if cur and len(cur) + 1 + len(sent) > CHUNK_SIZE:
+            chunks.append(cur)
+            # carry over the tail of the chunk, starting at a word boundary
+            tail = cur[-CHUNK_OVERLAP:]
+            tail = tail[tail.find(" ") + 1:]
+            cur = tail if len(tail) + 1 + len(sent) <= CHUNK_SIZE else ""
+        cur = f"{cur} {sent}" if cur else sent
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+def _chunk_id(doc):
+    """
+    Hash of a chunk's source file and content, used as its id in the vector store.
+    
+    Including the source means a renamed/moved file gets its chunks re-added
+    under the new path (and the old ones deleted), and identical text in two
+    files is stored once per file.
+    """
+    key = f"{doc.metadata.get('source', '')}\0{doc.page_content}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+def _load_manifest():
+    """
+    Load the manifest of chunks already in the vector store.
+    
+    Returns:
+        Dict of chunk id -> source file, or None if there is no usable manifest
+    """
+    try:
+        with open(os.path.join(PERSIST_DIR, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest.get("chunks", {})
+
+def _save_manifest(chunks):
+    """Record the chunk ids (and their source files) now in the vector store."""
+    with open(os.path.join(PERSIST_DIR, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "chunks": chunks}, f, indent=2)
+
+def _load_document(path):
+    """Read one corpus file into a Document."""
+    return Document(
+        page_content=path.read_text(encoding="utf-8"),
+        metadata={"source": str(path)}
+    )
 
 def ingest_documents():
     """
@@ -23,13 +123,10 @@ def ingest_documents():
     
     # Load documents
     try:
-        loader = DirectoryLoader(
-            CORPUS_DIR,
-            glob="**/*.txt",
-            loader_cls=TextLoader,
-            loader_kwargs={"encoding": "utf-8"}
-        )
-        documents = loader.load()
+        # Read files concurrently so disk I/O and decoding overlap
+        paths = sorted(Path(CORPUS_DIR).rglob("*.txt"))
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            documents = list(executor.map(_load_document, paths))
         
         if not documents:
             print(f"❌ No documents found in '{CORPUS_DIR}'")
@@ -43,55 +140,86 @@ def ingest_documents():
     
     # Split documents into chunks
     try:
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=50,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
-        splits = text_splitter.split_documents(documents)
+        splits = [
+            Document(page_content=chunk, metadata=dict(doc.metadata))
+            for doc in documents
+            for chunk in _split_text(doc.page_content)
+        ]
         print(f"✅ Split into {len(splits)} chunks")
         
     except Exception as e:
         print(f"❌ Error splitting documents: {e}")
         return False
     
-    # Create embeddings
-    try:
-        print("🔄 Creating embeddings (this may take a moment)...")
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
-        
-    except Exception as e:
-        print(f"❌ Error creating embeddings: {e}")
-        return False
+    # Diff chunks against what the vector store already holds
+    chunks = {}
+    for doc in splits:
+        chunks.setdefault(_chunk_id(doc), doc)
     
-    # Create vector store
-    try:
-        print(f"🔄 Creating vector store at '{PERSIST_DIR}'...")
-        
-        # Remove old database if exists
+    manifest = _load_manifest()
+    if manifest is None:
+        # No manifest (or an outdated one): start from an empty store
         if os.path.exists(PERSIST_DIR):
-            import shutil
             shutil.rmtree(PERSIST_DIR)
             print("🗑️  Removed old database")
+        manifest = {}
+    
+    new_ids = [cid for cid in chunks if cid not in manifest]
+    removed_ids = [cid for cid in manifest if cid not in chunks]
+    print(
+        f"✅ {len(new_ids)} new, {len(removed_ids)} removed, "
+        f"{len(chunks) - len(new_ids)} unchanged chunks"
+    )
+    
+    # Embed the new chunks in one bulk encode call (only needed if there is
+    # something new to embed)
+    new_docs = [chunks[cid] for cid in new_ids]
+    new_texts = [doc.page_content for doc in new_docs]
+    embs = None
+    if new_ids:
+        try:
+            print("🔄 Creating embeddings (this may take a moment)...")
+            # bulk-encode with the underlying SentenceTransformer
+            embs = get_embeddings().client.encode(
+                new_texts,
+                batch_size=256,
+                show_progress_bar=True,
+                normalize_embeddings=True,
+                convert_to_numpy=True
+            )
+            
+        except Exception as e:
+            print(f"❌ Error creating embeddings: {e}")
+            return False
+    
+    # Update vector store
+    try:
+        print(f"🔄 Updating vector store at '{PERSIST_DIR}'...")
         
-        vectordb = Chroma.from_documents(
-            documents=splits,
-            embedding=embeddings,
-            persist_directory=PERSIST_DIR
+        vectordb = Chroma(
+            persist_directory=PERSIST_DIR,
+            collection_metadata=HNSW_METADATA
         )
+        if removed_ids:
+            vectordb.delete(ids=removed_ids)
+        if new_ids:
+            # Vectors are precomputed, so hand them straight to the collection
+            vectordb._collection.add(
+                ids=new_ids,
+                documents=new_texts,
+                embeddings=embs.tolist(),
+                metadatas=[doc.metadata for doc in new_docs]
+            )
+        
+        _save_manifest({cid: doc.metadata.get("source", "") for cid, doc in chunks.items()})
         
-        print(f"✅ Vector store created successfully!")
+        print(f"✅ Vector store updated successfully!")
         print(f"📊 Total vectors: {vectordb._collection.count()}")
         
         return True
         
     except Exception as e:
-        print(f"❌ Error creating vector store: {e}")
+        print(f"❌ Error updating vector store: {e}")
         return False
 
 def main():
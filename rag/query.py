@@ -1,9 +1,36 @@
 import os
+from functools import lru_cache
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+try:
+    from rag.embeddings import get_embeddings
+except ImportError:
+    # run as a script from inside rag/
+    from embeddings import get_embeddings
 
 PERSIST_DIR = "chroma_db"
 
+# Vector store handle, opened on first query
+_DB = None
+
+def _get_db():
+    """Open the vector store once (with the shared embedding model), then reuse it."""
+    global _DB
+    if _DB is None:
+        _DB = Chroma(
+            persist_directory=PERSIST_DIR,
+            embedding_function=get_embeddings()
+        )
+    return _DB
+
+@lru_cache(maxsize=256)
+def _retrieve(question: str, top_k: int):
+    """Retrieve the top_k documents for a question (memoized per question/top_k)."""
+    retriever = _get_db().as_retriever(
+        search_type="similarity",
+        search_kwargs={"k": top_k}
+    )
+    return tuple(retriever.get_relevant_documents(question))
+
 def run_query(question: str, top_k: int = 3, verbose: bool = False) -> str:
     """
     Query the vector store and return relevant information.
@@ -27,27 +54,9 @@ def run_query(question: str, top_k: int = 3, verbose: bool = False) -> str:
         )
     
     try:
-        # Initialize embeddings
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
-        
-        # Load vector store
-        vectordb = Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=embeddings
-        )
-        
-        # Create retriever
-        retriever = vectordb.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": top_k}
-        )
-        
-        # Get relevant documents
-        docs = retriever.get_relevant_documents(question)
+        # Get relevant documents (reuses the loaded model / store and
+        # previously answered queries)
+        docs = _retrieve(question, top_k)
         
         if not docs:
             return "❌ No relevant information found in the knowledge base."